@@ -2,16 +2,13 @@
 
 import streamlit as st
 import tempfile
-import shutil
-from pathlib import Path
 import os
-import time
-import cv2
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import asyncio
+import random
 
 import config
-from video_processor import VideoProcessor
-from scribble_generator import ScribbleGenerator
+from video_processor import VideoProcessor, open_video_writer
+from scribble_generator import OrderedFrameWriter, ScribbleGenerator, scribble_frames_parallel
 
 
 # Page config
@@ -39,19 +36,25 @@ st.markdown("""
     </style>
     """, unsafe_allow_html=True)
 
-def process_single_frame(generator, frame_file, output_file, mode, delay):
-    """Process a single frame (used for parallel execution)."""
-    if mode == "ai":
-        generator._process_frame_ai(frame_file, output_file)
-        time.sleep(delay)  # Rate limiting
-    else:
-        generator._process_frame_experimental(frame_file, output_file)
+
+@st.cache_resource
+def _get_generator(mode: str) -> ScribbleGenerator:
+    """Build the scribble generator once per mode and reuse it across reruns."""
+    return ScribbleGenerator(mode=mode)
+
+
+async def _record_async(results, record):
+    """Drain an async stream of results, passing each one to `record`."""
+    completed = 0
+    async for result in results:
+        completed += 1
+        record(completed, result)
+
 
 def process_video(
-    video_path: str,
+    processor: VideoProcessor,
     duration: float,
     target_fps: int,
-    original_fps: float,
     mode: str,
     delay: float
 ):
@@ -61,106 +64,65 @@ def process_video(
     status_text = st.empty()
     
     try:
-        # Step 1: Extract frames
-        processor = VideoProcessor(video_path)
-        
-        # Get frame count first
-        import cv2
-        cap = cv2.VideoCapture(video_path)
-        original_total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        cap.release()
-        frames_to_extract = int(duration * original_fps)
-        
-        status_text.text(f"📹 Step 1/3: Extracting frames (0/{frames_to_extract})...")
-        
-        # Extract with progress updates
-        total_frames, fps, frame_size = processor.extract_frames(max_duration=duration)
-        progress_bar.progress(33)
+        # Video properties were already probed for the info panel
+        original_fps = processor.fps
+        frame_size = processor.frame_size
         
         # Calculate frame skip for FPS reduction
         frame_skip = int(original_fps / target_fps) if target_fps < original_fps else 1
+        frames_to_extract = processor.count_frames(duration)
+        frames_to_process = -(-frames_to_extract // frame_skip)
         
-        # If FPS reduction needed, subsample frames
-        if frame_skip > 1:
-            status_text.text(f"🎬 Subsampling frames (every {frame_skip} frames for {target_fps} FPS)...")
-            subsample_frames(config.TEMP_ORIGINAL_DIR, frame_skip)
-            # Update frame count after subsampling
-            remaining_frames = len(list(config.TEMP_ORIGINAL_DIR.glob("frame_*.jpg")))
-        else:
-            remaining_frames = total_frames
-        
-        # Step 2: Generate scribbles with progress updates (parallel processing)
-        generator = ScribbleGenerator(mode=mode)
-        frame_files = sorted(config.TEMP_ORIGINAL_DIR.glob("frame_*.jpg"))
+        status_text.text(f"🎨 Step 1/2: Generating scribbles (0/{frames_to_process})...")
         
-        # Process frames in parallel batches
-        max_workers = 5 if mode == "ai" else 10  # 5 parallel API calls for AI mode
-        completed = 0
-        
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # Submit all tasks
-            future_to_frame = {}
-            for frame_file in frame_files:
-                output_file = config.TEMP_SCRIBBLED_DIR / frame_file.name
-                future = executor.submit(
-                    process_single_frame,
-                    generator,
-                    frame_file,
-                    output_file,
-                    mode,
-                    delay
-                )
-                future_to_frame[future] = frame_file
-            
-            # Process completed tasks
-            for future in as_completed(future_to_frame):
-                completed += 1
-                status_text.text(f"🎨 Step 2/3: Generating scribbles ({completed}/{len(frame_files)})...")
-                
-                # Update progress (33% to 66%)
-                progress_pct = 33 + int((completed / len(frame_files)) * 33)
-                progress_bar.progress(progress_pct)
-                
-                # Check for errors
-                try:
-                    future.result()
-                except Exception as e:
-                    print(f"Error processing frame: {e}")
+        # Frames stream from the decoder through the scribble workers into the writer
+        # thread as in-memory BGR arrays; nothing is staged on disk.
+        frames = processor.iter_frames(max_duration=duration, frame_skip=frame_skip)
         
-        # Step 3: Stitch video with progress updates
-        output_dir = config.TEMP_SCRIBBLED_DIR
         output_path = config.OUTPUT_DIR / f"scribbled_output{config.VIDEO_EXTENSION}"
+        out = open_video_writer(output_path, target_fps, frame_size)
         
-        stitch_frames = sorted(output_dir.glob("frame_*.jpg"))
-        total_stitch = len(stitch_frames)
+        # Results arrive out of order; the writer thread encodes them in index order.
+        # Scribbled frames keep the source frame size, so they are written as-is.
+        writer = OrderedFrameWriter(out.write)
         
-        # Create video writer
-        fourcc = cv2.VideoWriter_fourcc(*config.VIDEO_CODEC)
-        out = cv2.VideoWriter(str(output_path), fourcc, target_fps, frame_size)
+        # Each Streamlit update is a message to the browser, so redraw only every few frames
+        redraw_every = max(1, frames_to_process // config.PROGRESS_REDRAWS)
         
-        for idx, frame_file in enumerate(stitch_frames, 1):
-            status_text.text(f"🎬 Step 3/3: Stitching video ({idx}/{total_stitch})...")
+        def record(completed, result):
+            writer.put(result)
+            if completed % redraw_every and completed != frames_to_process:
+                return
             
-            frame = cv2.imread(str(frame_file))
-            if (frame.shape[1], frame.shape[0]) != frame_size:
-                frame = cv2.resize(frame, frame_size)
-            out.write(frame)
+            status_text.text(f"🎨 Step 1/2: Generating scribbles ({completed}/{frames_to_process})...")
             
-            # Update progress (66% to 100%)
-            progress_pct = 66 + int((idx / total_stitch) * 34)
+            # Update progress (0% to 95%)
+            progress_pct = min(95, int((completed / frames_to_process) * 95))
             progress_bar.progress(progress_pct)
         
-        out.release()
-        progress_bar.progress(100)
-        
-        # Clean up temporary frames
-        status_text.text("🗑️ Cleaning up temporary files...")
-        clear_temp_folders()
+        try:
+            if mode == "ai":
+                # API calls are network-bound: run them concurrently on one event loop
+                generator = _get_generator(mode)
+                ai_results = generator.process_frames_async(frames, delay_between_requests=delay)
+                asyncio.run(_record_async(ai_results, record))
+            else:
+                results_iter = scribble_frames_parallel(frames, seed=random.randrange(2**32))
+                for completed, result in enumerate(results_iter, 1):
+                    record(completed, result)
+        finally:
+            status_text.text("🎬 Step 2/2: Finalizing video...")
+            try:
+                # Re-raises anything out.write failed with on the writer thread
+                writer.close()
+            finally:
+                out.release()
         
+        progress_bar.progress(100)
         status_text.text("✅ Processing complete!")
         
         return str(output_path), True
-        
+    
     except Exception as e:
         status_text.text(f"❌ Error: {str(e)}")
         import traceback
@@ -168,31 +130,10 @@ def process_video(
         return None, False
 
 
-def subsample_frames(frames_dir: Path, skip: int):
-    """Keep every Nth frame and remove others."""
-    frames = sorted(frames_dir.glob("frame_*.jpg"))
-    
-    frames_to_keep = frames[::skip]
-    frames_to_remove = [f for f in frames if f not in frames_to_keep]
-    
-    # Remove frames
-    for frame in frames_to_remove:
-        frame.unlink()
-    
-    # Rename remaining frames sequentially
-    for idx, frame in enumerate(sorted(frames_dir.glob("frame_*.jpg"))):
-        new_name = frames_dir / f"frame_{idx:05d}.jpg"
-        if frame != new_name:
-            frame.rename(new_name)
-
-
 def clear_temp_folders():
     """Clear temporary folders."""
     for folder in [config.TEMP_ORIGINAL_DIR, config.TEMP_SCRIBBLED_DIR]:
-        if folder.exists():
-            for file in folder.glob("*"):
-                if file.is_file():
-                    file.unlink()
+        VideoProcessor.clear_directory(folder)
 
 
 def main():
@@ -218,9 +159,9 @@ def main():
                 "Delay between API calls (sec)",
                 min_value=0.5,
                 max_value=3.0,
-                value=1.0,
+                value=60 / config.GEMINI_RPM,
                 step=0.1,
-                help="Delay to respect API rate limits"
+                help="Minimum spacing between API request starts, to respect rate limits"
             )
         else:
             delay = 0.5
@@ -251,15 +192,12 @@ def main():
             # Display video info
             st.video(video_path)
             
-            # Get video info
-            import cv2
-            cap = cv2.VideoCapture(video_path)
-            original_fps = cap.get(cv2.CAP_PROP_FPS)
-            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            # Get video info (probed once and reused for processing)
+            processor = VideoProcessor(video_path)
+            original_fps = processor.fps
+            total_frames = processor.total_frames
             video_duration = total_frames / original_fps
-            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-            cap.release()
+            width, height = processor.frame_size
             
             st.info(f"📊 **Video Info**\n\n- Resolution: {width}x{height}\n- FPS: {original_fps:.1f}\n- Duration: {video_duration:.2f} seconds\n- Total Frames: {total_frames}")
             
@@ -303,10 +241,9 @@ def main():
                     st.subheader("🎬 Processing")
                     
                     output_path, success = process_video(
-                        video_path,
+                        processor,
                         duration,
                         target_fps,
-                        original_fps,
                         mode,
                         delay
                     )
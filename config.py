@@ -14,6 +14,7 @@ OUTPUT_DIR = BASE_DIR / "output"
 TEMP_DIR = BASE_DIR / "temp"
 TEMP_ORIGINAL_DIR = TEMP_DIR / "original"
 TEMP_SCRIBBLED_DIR = TEMP_DIR / "scribbled"
+GEMINI_CACHE_DIR = TEMP_DIR / "gemini_cache"  # Generated images keyed by frame + prompt hash
 
 # API Configuration
 # Try to get API key from environment first (local .env file)
@@ -28,11 +29,39 @@ if not GOOGLE_API_KEY:
         pass  # Not running in Streamlit context
 
 GEMINI_MODEL = "gemini-2.5-flash-image"  # Image-to-image generation model
+GEMINI_MAX_CONCURRENCY = 5  # Maximum Gemini requests in flight at once
+GEMINI_RPM = 60  # Default request rate (requests per minute) to stay within API limits
+GEMINI_FRAMES_PER_REQUEST = 4  # Frames tiled into one request as a montage (4 = 2x2 grid, 1 = one frame per request)
+GEMINI_MAX_ATTEMPTS = 6  # Tries per request when Gemini is rate limited (429) or has a server error
+GEMINI_RETRY_MAX_WAIT = 60  # Cap in seconds on the randomized exponential backoff between tries
 
 # Video Processing Settings
 DEFAULT_FPS = 30
-VIDEO_CODEC = "mp4v"  # For .mp4 output
+VIDEO_CODEC = "mp4v"  # For .mp4 output when ffmpeg is unavailable (OpenCV VideoWriter); "MJPG" with ffmpeg copies the stored JPEGs in as-is
+FFMPEG_BINARY = os.getenv("FFMPEG_BINARY", "ffmpeg")
+# ffmpeg encoders tried in order of preference: NVIDIA, macOS, Intel/AMD on Linux, then CPU
+VIDEO_ENCODERS = ["h264_nvenc", "h264_videotoolbox", "h264_vaapi", "libx264"]
+VIDEO_ENCODER_OPTIONS = {
+    "h264_nvenc": ["-preset", "p4", "-tune", "ll"],
+    "h264_videotoolbox": ["-b:v", "8M"],
+    "h264_vaapi": ["-b:v", "8M"],
+    "libx264": ["-preset", "ultrafast", "-threads", "0"],
+}
+VAAPI_DEVICE = os.getenv("VAAPI_DEVICE", "/dev/dri/renderD128")
+# Encoders that take frames in GPU memory: (options before the input, upload filter)
+VIDEO_ENCODER_HW_UPLOAD = {
+    "h264_vaapi": (["-vaapi_device", VAAPI_DEVICE], "format=nv12,hwupload"),
+}
 VIDEO_EXTENSION = ".mp4"
+FRAME_FORMAT = ".jpg"  # Extracted frame files: ".jpg", or ".npy" for lossless raw arrays (fastest, but width*height*3 bytes each)
+JPEG_QUALITY = 90  # Quality of intermediate frames stored in temp/
+SCRIBBLE_JPEG_QUALITY = 80  # Scribbled frames are only re-read for stitching; 80 is visually identical and much smaller
+USE_GPU_JPEG_DECODE = True  # Batch-decode frames with nvJPEG when torchvision + CUDA are available
+GPU_DECODE_BATCH_SIZE = 64
+FRAME_WRITE_WORKERS = 4  # Threads encoding extracted frames to JPEG while decoding continues
+DECODE_BATCH_SIZE = 16  # Raw frames read from the ffmpeg decoder pipe per call
+STITCH_QUEUE_SIZE = 32  # Decoded frames buffered between the stitch decode and encode threads
+PROGRESS_REDRAWS = 200  # Roughly how many times a progress bar is redrawn over a run
 MAX_DURATION_SECONDS = None  # Set to number (e.g., 3) to process only first N seconds, None for full video
 
 # Scribble Generation Settings
@@ -40,8 +69,16 @@ SCRIBBLE_PROMPTS = [
     "Add a playful overlay of hand-drawn doodles on top of this image. First, detect the main subjects, objects, and strong edges in the scene. Draw thick, bold white contour lines around these elements — the outlines should loosely follow their shapes, creating an exaggerated marker-style border that clearly separates each object from the background. Then add colorful doodles (stars, swirls, smiley faces, loops, zigzags, waves, and marker scribbles) in bright red, yellow, green, and blue. Make the doodles hug the edges and flow around the outlined elements, following their curves or general direction, rather than floating randomly. They should feel like they interact with the objects. Ensure each doodle has a sense of direction and motion — for example: wrapping around a corner, pointing toward edges, or swirling along shapes. Keep a small amount of space between doodles, so they do not overlap each other, but still appear energetic and lively. Preserve the original photo underneath. The final result should look like a stylized, expressive scribble layer with bold outlines emphasizing the subjects and playful doodles that follow and accent the scene."
 ]
 
+# Wraps a scribble prompt for montage requests (several frames tiled into one image)
+SCRIBBLE_MONTAGE_PROMPT = (
+    "This image is a grid of {rows} rows by {cols} columns of separate video frames. "
+    "Edit every tile independently as described below, and return the full grid with the same "
+    "layout, tile boundaries and aspect ratio. {prompt}"
+)
+
 # Experimental mode settings (procedural generation)
 EXPERIMENTAL_SCRIBBLE_COUNT = 20  # Number of scribbles per frame
+SCRIBBLE_THREADS = min(8, os.cpu_count() or 1)  # Threads drawing experimental frames (OpenCV drawing releases the GIL)
 SCRIBBLE_COLORS = [
     (255, 0, 0),      # Red
     (0, 255, 0),      # Green
@@ -52,5 +89,5 @@ SCRIBBLE_COLORS = [
 ]
 
 # Ensure directories exist
-for directory in [INPUT_DIR, OUTPUT_DIR, TEMP_ORIGINAL_DIR, TEMP_SCRIBBLED_DIR]:
+for directory in [INPUT_DIR, OUTPUT_DIR, TEMP_ORIGINAL_DIR, TEMP_SCRIBBLED_DIR, GEMINI_CACHE_DIR]:
     directory.mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,340 @@
+"""Frame I/O helpers for reading and writing intermediate frames (JPEG, or raw .npy arrays)."""
+
+import mmap
+import os
+from functools import lru_cache
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+import cv2
+import numpy as np
+from tqdm import tqdm
+import config
+
+# simplejpeg wraps libjpeg-turbo directly and is noticeably faster than
+# OpenCV's JPEG codec; fall back to OpenCV when it is not installed.
+try:
+    import simplejpeg
+except ImportError:
+    simplejpeg = None
+
+
+def encode_frame(frame: np.ndarray, quality: int = config.JPEG_QUALITY) -> bytes:
+    """
+    Encode a BGR frame as JPEG.
+    
+    Args:
+        frame: BGR frame
+        quality: JPEG quality (0-100)
+        
+    Returns:
+        JPEG bytes
+    """
+    if simplejpeg is None:
+        # Baseline, non-optimized JPEG is the cheapest to encode and decode
+        _, data = cv2.imencode(".jpg", frame, [
+            cv2.IMWRITE_JPEG_QUALITY, quality,
+            cv2.IMWRITE_JPEG_OPTIMIZE, 0,
+            cv2.IMWRITE_JPEG_PROGRESSIVE, 0,
+        ])
+        return data.tobytes()
+    
+    # simplejpeg defaults to 4:4:4; 4:2:0 (OpenCV's default) is much cheaper to encode and decode
+    return simplejpeg.encode_jpeg(np.ascontiguousarray(frame), quality=quality, colorspace="BGR", colorsubsampling="420")
+
+
+def decode_frame(data, out: np.ndarray = None) -> np.ndarray:
+    """
+    Decode a JPEG into a BGR frame.
+    
+    Args:
+        data: JPEG bytes (any buffer, e.g. a memoryview into an mmap)
+        out: Optional preallocated frame to decode into; used only when its
+            shape matches the image and simplejpeg is installed
+            
+    Returns:
+        BGR frame (`out` itself when it was decoded into)
+    """
+    if simplejpeg is None:
+        return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    
+    if out is not None:
+        height, width, _, _ = simplejpeg.decode_jpeg_header(data)
+        if out.shape == (height, width, 3):
+            return simplejpeg.decode_jpeg(data, colorspace="BGR", buffer=out)
+    
+    return simplejpeg.decode_jpeg(data, colorspace="BGR")
+
+
+def jpeg_size(data) -> Tuple[int, int]:
+    """
+    Get a JPEG's dimensions, reading only its header when simplejpeg is installed.
+    
+    Args:
+        data: JPEG bytes (any buffer)
+        
+    Returns:
+        Dimensions as (width, height)
+    """
+    if simplejpeg is None:
+        height, width = decode_frame(data).shape[:2]
+        return width, height
+    
+    height, width, _, _ = simplejpeg.decode_jpeg_header(data)
+    return width, height
+
+
+def read_frame(path: Path) -> np.ndarray:
+    """
+    Read a frame from disk.
+    
+    Args:
+        path: Path to the JPEG or .npy file
+        
+    Returns:
+        BGR frame
+    """
+    if Path(path).suffix == ".npy":
+        return np.load(path)
+    return decode_frame(Path(path).read_bytes())
+
+
+def read_frames(paths: List[Path], ring_size: int = 0) -> Iterator[np.ndarray]:
+    """
+    Read a sequence of frames from disk.
+    
+    Args:
+        paths: Paths to the JPEG (or .npy) files, in output order
+        ring_size: Number of reused decode buffers (see decode_frames)
+        
+    Yields:
+        BGR frames
+    """
+    if paths and Path(paths[0]).suffix == ".npy":
+        # Raw arrays need no decoding
+        return (np.load(path) for path in paths)
+    return decode_frames((Path(path).read_bytes() for path in paths), ring_size=ring_size)
+
+
+def decode_frames(
+    encoded: Iterable,
+    batch_size: int = config.GPU_DECODE_BATCH_SIZE,
+    ring_size: int = 0
+) -> Iterator[np.ndarray]:
+    """
+    Decode a sequence of JPEGs, batch-decoding them on the GPU when possible.
+    
+    With ring_size > 0, CPU decoding cycles through that many preallocated
+    frames instead of allocating one per image, so a yielded frame is
+    overwritten ring_size frames later. Callers must not hold more than
+    ring_size frames at once.
+    
+    Args:
+        encoded: JPEG buffers, in output order
+        batch_size: Number of frames handed to nvJPEG per call
+        ring_size: Number of reused decode buffers (0 allocates every frame)
+        
+    Yields:
+        BGR frames
+    """
+    if not _nvjpeg_available():
+        ring = [None] * ring_size
+        for i, data in enumerate(encoded):
+            if not ring:
+                yield decode_frame(data)
+                continue
+            
+            # The first pass (or a size change) allocates; later passes decode in place
+            slot = i % ring_size
+            ring[slot] = decode_frame(data, out=ring[slot])
+            yield ring[slot]
+        return
+    
+    import torch
+    from torchvision.io import decode_jpeg
+    
+    encoded = iter(encoded)
+    while chunk := list(islice(encoded, batch_size)):
+        tensors = [torch.frombuffer(bytearray(data), dtype=torch.uint8) for data in chunk]
+        
+        # CHW RGB on the GPU -> HWC BGR on the host. Frames are converted one by
+        # one because AI output is not guaranteed to share a single size.
+        for image in decode_jpeg(tensors, device="cuda"):
+            yield image.permute(1, 2, 0).flip(-1).contiguous().cpu().numpy()
+
+
+@lru_cache(maxsize=None)
+def _nvjpeg_available() -> bool:
+    """Check once whether torchvision can decode JPEGs with nvJPEG."""
+    if not config.USE_GPU_JPEG_DECODE:
+        return False
+    try:
+        import torch
+        from torchvision.io import decode_jpeg  # noqa: F401
+    except ImportError:
+        return False
+    return torch.cuda.is_available()
+
+
+def progress_bar(total: Optional[int], desc: str) -> tqdm:
+    """
+    Create a per-frame progress bar that redraws about config.PROGRESS_REDRAWS times per run.
+    
+    Args:
+        total: Expected number of frames (None if unknown)
+        desc: Label shown before the bar
+        
+    Returns:
+        tqdm progress bar
+    """
+    return tqdm(
+        total=total, desc=desc, unit="frame",
+        miniters=max(1, (total or 0) // config.PROGRESS_REDRAWS), mininterval=0.1
+    )
+
+
+def list_frame_files(directory: Path, extension: str = config.FRAME_FORMAT) -> List[Path]:
+    """
+    List the frame_* files in a directory, in frame order.
+    
+    Uses os.scandir and sorts plain names: frame numbers are zero-padded, so
+    string order is frame order, and no Path object is built until the end.
+    
+    Args:
+        directory: Directory holding the frames
+        extension: Frame file extension (".jpg" or ".npy")
+        
+    Returns:
+        Sorted frame paths
+    """
+    with os.scandir(directory) as entries:
+        names = sorted(entry.name for entry in entries if entry.name.startswith("frame_") and entry.name.endswith(extension))
+    return [Path(directory) / name for name in names]
+
+
+def write_frame(path: Path, frame: np.ndarray, quality: int = config.JPEG_QUALITY):
+    """
+    Write a BGR frame to disk, as JPEG or, for a .npy path, as a raw array.
+    
+    Args:
+        path: Destination path
+        frame: BGR frame
+        quality: JPEG quality (0-100)
+    """
+    if Path(path).suffix == ".npy":
+        # Lossless and no encoding work, at the cost of disk space
+        np.save(path, frame)
+        return
+    
+    with open(path, "wb") as f:
+        f.write(encode_frame(frame, quality))
+
+
+class FrameArena:
+    """
+    Encoded frames packed back to back in a single file.
+    
+    Frames are appended to `frames.bin` and located through an (offset, length)
+    index saved as `offsets.npy`. Reading memory-maps the data file and slices
+    it, so a whole video is read without one open()/close() per frame.
+    """
+    
+    DATA_FILE = "frames.bin"
+    INDEX_FILE = "offsets.npy"
+    
+    def __init__(self, directory: Path):
+        """Initialize with the directory holding (or receiving) the arena."""
+        self.data_path = Path(directory) / self.DATA_FILE
+        self.index_path = Path(directory) / self.INDEX_FILE
+        self._file = None
+        self._offsets = []
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def __len__(self) -> int:
+        """Number of frames in a saved arena."""
+        return len(np.load(self.index_path))
+    
+    def exists(self) -> bool:
+        """Check whether a complete arena has been saved in the directory."""
+        return self.index_path.exists() and self.data_path.exists()
+    
+    def append(self, frame: np.ndarray, quality: int = config.JPEG_QUALITY):
+        """
+        Encode a BGR frame and append it to the arena.
+        
+        Args:
+            frame: BGR frame
+            quality: JPEG quality (0-100)
+        """
+        if self._file is None:
+            self.index_path.unlink(missing_ok=True)
+            self._file = open(self.data_path, "wb")
+        
+        data = encode_frame(frame, quality)
+        self._offsets.append((self._file.tell(), len(data)))
+        self._file.write(data)
+    
+    def close(self):
+        """Finish writing and save the offset index."""
+        if self._file is None:
+            return
+        
+        self._file.close()
+        self._file = None
+        np.save(self.index_path, np.array(self._offsets, dtype=np.int64).reshape(-1, 2))
+    
+    def read(self, ring_size: int = 0) -> Iterator[np.ndarray]:
+        """
+        Decode every frame in a saved arena, in order.
+        
+        Args:
+            ring_size: Number of reused decode buffers (see decode_frames)
+            
+        Yields:
+            BGR frames
+        """
+        yield from decode_frames(self.read_encoded(), ring_size=ring_size)
+    
+    def read_encoded(self) -> Iterator[memoryview]:
+        """
+        Yield every frame in a saved arena as JPEG bytes, in order, without decoding.
+        
+        Yields:
+            Memoryviews into the memory-mapped data file
+        """
+        offsets = np.load(self.index_path)
+        with open(self.data_path, "rb") as f:
+            # The mapping stays valid after the file is closed
+            view = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        
+        for offset, length in offsets.tolist():
+            yield view[offset:offset + length]
+
+
+def resize_frame(frame: np.ndarray, frame_size: Tuple[int, int]) -> np.ndarray:
+    """
+    Resize a frame, through OpenCL (cv2.UMat) when a device is available.
+    
+    Args:
+        frame: BGR frame
+        frame_size: Target dimensions as (width, height)
+        
+    Returns:
+        Resized BGR frame
+    """
+    # INTER_AREA averages pixels when shrinking, but enlarging with it is
+    # nearest-neighbour; Gemini output is usually smaller than the source
+    height, width = frame.shape[:2]
+    shrinking = frame_size[0] <= width and frame_size[1] <= height
+    interpolation = cv2.INTER_AREA if shrinking else cv2.INTER_LINEAR
+    
+    if cv2.ocl.haveOpenCL() and cv2.ocl.useOpenCL():
+        # Resizing is memory-bound, so run it on the OpenCL device when there is one
+        return cv2.resize(cv2.UMat(frame), frame_size, interpolation=interpolation).get()
+    
+    return cv2.resize(frame, frame_size, interpolation=interpolation)
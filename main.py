@@ -57,8 +57,8 @@ def main():
     parser.add_argument(
         "--delay",
         type=float,
-        default=1.0,
-        help="Delay between AI requests in seconds (default: 1.0)"
+        default=60 / config.GEMINI_RPM,
+        help=f"Minimum spacing between AI request starts in seconds (default: {60 / config.GEMINI_RPM:g})"
     )
     parser.add_argument(
         "--output",
@@ -69,8 +69,16 @@ def main():
         type=float,
         help="Process only first N seconds of video (e.g., --duration 3)"
     )
+    parser.add_argument(
+        "--stride",
+        type=int,
+        default=1,
+        help="Keep every Nth frame for a faster preview; skipped frames are never decoded (default: 1)"
+    )
     
     args = parser.parse_args()
+    if args.stride < 1:
+        parser.error("--stride must be at least 1")
     
     # Get video path
     if args.video:
@@ -108,23 +116,44 @@ def main():
     print("=" * 50)
     
     try:
-        # Step 1: Extract frames
-        print("\n🎬 STEP 1: Extracting frames from video...")
-        print("=" * 50)
         processor = VideoProcessor(video_path)
         max_duration = args.duration if args.duration else config.MAX_DURATION_SECONDS
-        total_frames, fps, frame_size = processor.extract_frames(max_duration=max_duration)
         
-        # Step 2: Generate scribbles
-        print("\n🎨 STEP 2: Generating scribbles on each frame...")
-        print("=" * 50)
-        generator = ScribbleGenerator(mode=args.mode)
-        generator.process_frames(delay_between_requests=args.delay)
-        
-        # Step 3: Stitch video
-        print("\n🎬 STEP 3: Stitching frames into final video...")
-        print("=" * 50)
-        output_path = processor.stitch_frames(output_path=args.output)
+        if args.mode == "experimental":
+            # Nothing sits between the stages, so frames stream from the decoder
+            # through the scribbler into the encoder without touching the disk
+            print("\n🎬 Scribbling frames straight into the video...")
+            print("=" * 50)
+            total_frames = -(-processor.count_frames(max_duration) // args.stride)
+            fps, frame_size = processor.fps / args.stride, processor.frame_size
+            frames = processor.iter_frames(max_duration=max_duration, frame_skip=args.stride)
+            generator = ScribbleGenerator(mode=args.mode, frame_size=frame_size)
+            output_path = processor.stitch_from_iterable(
+                generator.process_frames_streaming(frames),
+                output_path=args.output,
+                fps=fps,
+                total=total_frames
+            )
+        else:
+            # Step 1: Extract frames
+            print("\n🎬 STEP 1: Extracting frames from video...")
+            print("=" * 50)
+            total_frames, fps, frame_size = processor.extract_frames(max_duration=max_duration, frame_skip=args.stride)
+            fps /= args.stride  # Keep the original duration when frames are skipped
+            
+            # Step 2: Generate scribbles
+            print("\n🎨 STEP 2: Generating scribbles on each frame...")
+            print("=" * 50)
+            generator = ScribbleGenerator(mode=args.mode, frame_size=frame_size)
+            generator.process_frames(
+                delay_between_requests=args.delay,
+                frame_files=processor.frame_files
+            )
+            
+            # Step 3: Stitch video
+            print("\n🎬 STEP 3: Stitching frames into final video...")
+            print("=" * 50)
+            output_path = processor.stitch_frames(output_path=args.output, fps=fps)
         
         # Success!
         print("\n" + "=" * 50)
@@ -136,7 +165,7 @@ def main():
         print(f"⏱️  FPS: {fps}")
         print(f"📐 Resolution: {frame_size[0]}x{frame_size[1]}")
         print("\n🎉 Your scribbled video is ready to watch!")
-        
+    
     except KeyboardInterrupt:
         print("\n\n⚠️  Process interrupted by user")
         sys.exit(1)
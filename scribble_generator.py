@@ -1,30 +1,66 @@
 """Scribble generation module using Gemini AI and experimental procedural methods."""
 
+import asyncio
+import hashlib
+import queue
 import random
+import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional
+from typing import AsyncIterator, Callable, Iterable, Iterator, List, Optional, Tuple
 import cv2
 import numpy as np
-from PIL import Image, ImageDraw
 from tqdm import tqdm
 from google import genai
-from google.genai import types
+from google.genai import errors, types
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_random_exponential
 
 import config
+from frame_io import FrameArena, encode_frame, list_frame_files, progress_bar, read_frame, resize_frame
+
+
+def _unit_points(angles: np.ndarray, radii=1.0) -> np.ndarray:
+    """Points at the given angles (degrees) and radii around the origin, as an (N, 2) array."""
+    angles = np.deg2rad(angles)
+    return np.stack([radii * np.cos(angles), radii * np.sin(angles)], axis=1)
 
 
 class ScribbleGenerator:
     """Generates scribbled versions of images using AI or procedural methods."""
     
-    def __init__(self, mode: str = "ai"):
+    # Constant scribble geometry, computed once; each shape is a scale + translate of these
+    _STAR_UNIT = _unit_points(np.arange(11) * 36 - 90, np.where(np.arange(11) % 2 == 0, 1.0, 0.5))  # Closed outline
+    _SWIRL_OFFSETS = _unit_points(np.rad2deg(np.arange(20) * 0.5), np.arange(20) * 2)
+    _CIRCLE_UNIT = _unit_points(np.arange(0, 361, 10))
+    _EYE_UNIT = _unit_points(np.arange(0, 361, 30))
+    _SMILE_UNIT = _unit_points(np.arange(0, 181, 10))
+    
+    def __init__(self, mode: str = "ai", frame_size: Optional[Tuple[int, int]] = None):
         """
         Initialize scribble generator.
         
+        Every scribbled frame leaves the generator at frame_size, so the video
+        writer can take frames as-is.
+        
         Args:
             mode: Generation mode - "ai" or "experimental"
+            frame_size: Output dimensions as (width, height) (default: input frame size)
         """
         self.mode = mode
+        self.frame_size = frame_size
+        self._rng = np.random.default_rng()
+        
+        # Shape adders share one signature, so a scribble is one table lookup and one call
+        self._shape_adders = (
+            self._add_star,
+            self._add_swirl,
+            self._add_squiggly_line,
+            self._add_circle,
+            self._add_smiley,
+        )
         
         if mode == "ai":
             self._setup_ai()
@@ -37,22 +73,27 @@ class ScribbleGenerator:
                 "Get your key from: https://makersuite.google.com/app/apikey"
             )
         
-        self.client = genai.Client(api_key=config.GOOGLE_API_KEY)
+        self.client = _get_client(config.GOOGLE_API_KEY)
         print(f"✅ Gemini AI initialized with model: {config.GEMINI_MODEL}\n")
     
     def process_frames(
         self, 
         input_dir: Path = None, 
         output_dir: Path = None,
-        delay_between_requests: float = 1.0
+        delay_between_requests: float = 60 / config.GEMINI_RPM,
+        frame_files: List[Path] = None
     ):
         """
         Process all frames in directory.
         
+        Scribbled frames are packed into a FrameArena in output_dir, ready for
+        VideoProcessor.stitch_frames.
+        
         Args:
             input_dir: Directory with original frames
             output_dir: Directory to save scribbled frames
-            delay_between_requests: Delay between API calls (seconds)
+            delay_between_requests: Minimum spacing between API request starts (seconds)
+            frame_files: Frames to process, in order (skips listing input_dir)
         """
         if input_dir is None:
             input_dir = config.TEMP_ORIGINAL_DIR
@@ -60,7 +101,8 @@ class ScribbleGenerator:
             output_dir = config.TEMP_SCRIBBLED_DIR
         
         # Get all frames
-        frame_files = sorted(input_dir.glob("frame_*.jpg"))
+        if frame_files is None:
+            frame_files = list_frame_files(input_dir)
         
         if not frame_files:
             raise ValueError(f"No frames found in {input_dir}")
@@ -68,172 +110,639 @@ class ScribbleGenerator:
         print(f"🎨 Processing {len(frame_files)} frames in '{self.mode}' mode...\n")
         
         # Process each frame
-        with tqdm(total=len(frame_files), desc="Generating scribbles", unit="frame") as pbar:
-            for frame_file in frame_files:
-                output_file = output_dir / frame_file.name
-                
-                if self.mode == "ai":
-                    self._process_frame_ai(frame_file, output_file)
-                    # Add delay to respect rate limits
-                    time.sleep(delay_between_requests)
-                else:
-                    self._process_frame_experimental(frame_file, output_file)
-                
-                pbar.update(1)
+        with FrameArena(output_dir) as arena, \
+                progress_bar(len(frame_files), "Generating scribbles") as pbar:
+            if self.mode == "ai":
+                # Requests are network-bound: keep several in flight on one event loop
+                asyncio.run(self._process_files_async(frame_files, arena, pbar, delay_between_requests))
+            else:
+                frames = ((idx, read_frame(frame_file)) for idx, frame_file in enumerate(frame_files))
+                for scribbled in self.process_frames_streaming(frames):
+                    arena.append(scribbled, quality=config.SCRIBBLE_JPEG_QUALITY)
+                    pbar.update(1)
         
         print(f"✅ All frames processed and saved to {output_dir}\n")
     
-    def _process_frame_ai(self, input_path: Path, output_path: Path):
+    def process_frames_streaming(self, frames: Iterable[Tuple[int, np.ndarray]]) -> Iterator[np.ndarray]:
         """
-        Process single frame using Gemini AI.
+        Scribble frames in experimental mode as they stream in, without touching the disk.
+        
+        Frames are drawn on a small thread pool (see scribble_frames_parallel),
+        each with its own generator seeded from (run seed, index), and handed
+        back in order.
         
         Args:
-            input_path: Path to input frame
-            output_path: Path to save scribbled frame
+            frames: Iterable of (index, BGR frame) pairs, indices numbered from 0
+            
+        Yields:
+            Scribbled BGR frames, in order
         """
+        seed = random.randrange(2**32)
+        results = scribble_frames_parallel(frames, self.frame_size, seed)
+        yield from ordered_frames(results)
+    
+    async def _process_files_async(
+        self,
+        frame_files: List[Path],
+        arena: FrameArena,
+        pbar: tqdm,
+        delay_between_requests: float
+    ):
+        """Scribble frame files with concurrent Gemini requests, appending results to the arena in order."""
+        frames = ((idx, read_frame(frame_file)) for idx, frame_file in enumerate(frame_files))
+        results = self.process_frames_async(frames, delay_between_requests=delay_between_requests)
+        
+        # Results arrive in completion order; the writer appends them to the arena in index order
+        writer = OrderedFrameWriter(lambda frame: arena.append(frame, quality=config.SCRIBBLE_JPEG_QUALITY))
         try:
-            # Load image
-            image = Image.open(input_path)
+            async for result in results:
+                writer.put(result)
+                pbar.update(1)
+        finally:
+            writer.close()
+    
+    async def process_frames_async(
+        self,
+        frames: Iterable[Tuple[int, np.ndarray]],
+        max_concurrency: int = config.GEMINI_MAX_CONCURRENCY,
+        delay_between_requests: float = 60 / config.GEMINI_RPM,
+        frames_per_request: int = config.GEMINI_FRAMES_PER_REQUEST
+    ) -> AsyncIterator[Tuple[int, np.ndarray]]:
+        """
+        Scribble frames with concurrent Gemini requests, yielding results as they complete.
+        
+        Uncached frames are sent frames_per_request at a time as one montage
+        image, so fewer requests are spent against the rate limit.
+        
+        Args:
+            frames: Iterable of (index, BGR frame) pairs
+            max_concurrency: Maximum number of requests in flight
+            delay_between_requests: Minimum spacing between request starts (seconds)
+            frames_per_request: Frames tiled into each request (1 disables montages)
             
-            # Select random prompt for variety
-            prompt = random.choice(config.SCRIBBLE_PROMPTS)
+        Yields:
+            Tuples of (index, scribbled BGR frame), in completion order
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        limiter = AsyncRateLimiter(1 / delay_between_requests) if delay_between_requests > 0 else None
+        
+        async def scribble(idx, frame, prompt, cache_file, tile_cache_file):
+            async with semaphore:
+                if limiter is not None:
+                    await limiter.acquire()
+                return idx, await self._process_frame_ai_async(frame, prompt, cache_file, f"frame_{idx:05d}")
+        
+        async def scribble_batch(batch):
+            if len(batch) == 1:
+                return [await scribble(*batch[0])]
             
-            # Generate scribbled version using image-to-image
-            response = self.client.models.generate_content(
-                model=config.GEMINI_MODEL,
-                contents=[prompt, image],
-            )
+            # Batches are grouped by prompt, so every tile shares prompts[0]
+            indices, batch_frames, prompts, _, tile_cache_files = zip(*batch)
+            async with semaphore:
+                if limiter is not None:
+                    await limiter.acquire()
+                tiles = await self._process_montage_ai_async(
+                    batch_frames, prompts[0], tile_cache_files, frames_per_request
+                )
             
-            # Extract and save the generated image
-            image_saved = False
-            for part in response.parts:
-                if part.inline_data is not None:
-                    generated_image = part.as_image()
-                    generated_image.save(output_path)
-                    image_saved = True
-                    break
-            
-            # Fallback if no image was generated
-            if not image_saved:
-                print(f"\n⚠️  No image returned for {input_path.name}, using experimental mode")
-                self._process_frame_experimental(input_path, output_path)
-                
+            if tiles is None:
+                # The model didn't keep the grid; send the frames one by one
+                return await asyncio.gather(*(scribble(*item) for item in batch))
+            return list(zip(indices, tiles))
+        
+        # Keep only a small window of decoded frames waiting on the API
+        pending = set()
+        batches = {}  # prompt -> frames waiting to be tiled into one montage
+        for idx, frame in frames:
+            # Cache hits skip the API, so they don't wait for a request slot. A
+            # full-resolution single-frame result is preferred over a montage tile.
+            prompt, cache_file, tile_cache_file = self._cache_entry(frame, frames_per_request)
+            scribbled = self._read_cache(cache_file, frame)
+            if scribbled is None and tile_cache_file is not None:
+                scribbled = self._read_cache(tile_cache_file, frame)
+            if scribbled is not None:
+                yield idx, scribbled
+                continue
+            
+            # A montage is sent with a single prompt, so frames are batched per prompt
+            batch = batches.setdefault(prompt, [])
+            batch.append((idx, frame, prompt, cache_file, tile_cache_file))
+            if len(batch) < frames_per_request:
+                continue
+            
+            pending.add(asyncio.create_task(scribble_batch(batches.pop(prompt))))
+            if len(pending) >= max_concurrency * 2:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    for result in task.result():
+                        yield result
+        
+        for batch in batches.values():
+            pending.add(asyncio.create_task(scribble_batch(batch)))
+        
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                for result in task.result():
+                    yield result
+    
+    async def _process_frame_ai_async(
+        self,
+        frame: np.ndarray,
+        prompt: str,
+        cache_file: Path,
+        name: str = "frame"
+    ) -> np.ndarray:
+        """
+        Process single frame using Gemini AI without blocking the event loop.
+        
+        Args:
+            frame: BGR frame to scribble on
+            prompt: Prompt to send with the frame
+            cache_file: Where to cache the generated image (see _cache_entry)
+            name: Frame name used in log messages
+            
+        Returns:
+            Scribbled BGR frame
+        """
+        try:
+            image = _image_part(frame)
+            
+            response = await _generate_content(self.client, [prompt, image])
+            
+            data = self._image_data(response)
+            scribbled = self._decode_image(data, frame) if data is not None else None
+            if scribbled is not None:
+                self._write_cache(cache_file, data)
+                return scribbled
+            
+            print(f"\n⚠️  No image returned for {name}, using experimental mode")
+            return self._process_frame_experimental(frame)
+        
         except Exception as e:
-            print(f"\n⚠️  AI generation failed for {input_path.name}: {e}")
+            print(f"\n⚠️  AI generation failed for {name}: {e}")
             print("   Falling back to experimental mode...")
-            self._process_frame_experimental(input_path, output_path)
+            return self._process_frame_experimental(frame)
     
-    def _process_frame_experimental(self, input_path: Path, output_path: Path):
+    async def _process_montage_ai_async(
+        self,
+        frames: List[np.ndarray],
+        prompt: str,
+        cache_files: List[Path],
+        grid_frames: int
+    ) -> Optional[List[np.ndarray]]:
         """
-        Process single frame using procedural scribble generation.
+        Scribble several frames with one Gemini request by tiling them into a grid.
         
         Args:
-            input_path: Path to input frame
-            output_path: Path to save scribbled frame
+            frames: BGR frames of the same size (at most grid_frames)
+            prompt: Prompt applied to every tile
+            cache_files: Where to cache each tile's result (see _cache_entry)
+            grid_frames: Number of tiles in the grid; missing tiles are left black
+            
+        Returns:
+            Scribbled BGR frames, or None if the request failed or the model
+            didn't return the grid
         """
-        # Load image
-        img = Image.open(input_path)
+        cols = int(np.ceil(np.sqrt(grid_frames)))
+        rows = -(-grid_frames // cols)
         
-        # Create drawing context
-        draw = ImageDraw.Draw(img)
-        width, height = img.size
+        try:
+            montage = _montage(frames, rows, cols)
+            image = _image_part(montage)
+            montage_prompt = config.SCRIBBLE_MONTAGE_PROMPT.format(rows=rows, cols=cols, prompt=prompt)
+            
+            response = await _generate_content(self.client, [montage_prompt, image])
+            
+            data = self._image_data(response)
+            grid = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR) if data is not None else None
+        except Exception as e:
+            print(f"\n⚠️  AI montage request failed: {e}")
+            return None
         
-        # Generate random scribbles
-        for _ in range(config.EXPERIMENTAL_SCRIBBLE_COUNT):
-            scribble_type = random.choice(['star', 'swirl', 'line', 'circle', 'smiley'])
-            color = random.choice(config.SCRIBBLE_COLORS)
-            line_width = random.randint(2, 5)
-            
-            if scribble_type == 'star':
-                self._draw_star(draw, width, height, color, line_width)
-            elif scribble_type == 'swirl':
-                self._draw_swirl(draw, width, height, color, line_width)
-            elif scribble_type == 'line':
-                self._draw_squiggly_line(draw, width, height, color, line_width)
-            elif scribble_type == 'circle':
-                self._draw_circle(draw, width, height, color, line_width)
-            elif scribble_type == 'smiley':
-                self._draw_smiley(draw, width, height, color, line_width)
-        
-        # Save scribbled image
-        img.save(output_path)
-    
-    def _draw_star(self, draw, width, height, color, line_width):
-        """Draw a random star."""
-        cx = random.randint(0, width)
-        cy = random.randint(0, height)
-        size = random.randint(10, 40)
-        
-        # 5-pointed star
-        points = []
-        for i in range(10):
-            angle = (i * 36 - 90) * (3.14159 / 180)
-            r = size if i % 2 == 0 else size / 2
-            x = cx + r * np.cos(angle)
-            y = cy + r * np.sin(angle)
-            points.append((x, y))
+        # A grid image keeps the montage's aspect ratio; anything else means the layout was lost
+        if grid is None or abs(grid.shape[1] / grid.shape[0] - montage.shape[1] / montage.shape[0]) > 0.05:
+            print("\n⚠️  No grid image returned for montage, retrying frames one by one")
+            return None
+        
+        height, width = grid.shape[:2]
+        tiles = []
+        for i, (frame, cache_file) in enumerate(zip(frames, cache_files)):
+            row, col = divmod(i, cols)
+            tile = grid[row * height // rows:(row + 1) * height // rows, col * width // cols:(col + 1) * width // cols]
+            self._write_cache(cache_file, cv2.imencode(".png", tile)[1].tobytes())
+            tiles.append(self._fit_image(tile, frame))
         
-        draw.polygon(points, outline=color, width=line_width)
+        return tiles
     
-    def _draw_swirl(self, draw, width, height, color, line_width):
-        """Draw a random swirl."""
-        cx = random.randint(0, width)
-        cy = random.randint(0, height)
+    def _cache_entry(self, frame: np.ndarray, frames_per_request: int = 1) -> Tuple[str, Path, Optional[Path]]:
+        """
+        Pick the prompt for a frame and locate its cached results.
         
-        points = []
-        for i in range(20):
-            angle = i * 0.5
-            r = i * 2
-            x = cx + r * np.cos(angle)
-            y = cy + r * np.sin(angle)
-            points.append((x, y))
+        Generated images are cached on disk by content hash, so re-runs and
+        duplicate frames skip the API. The prompt is chosen from the frame hash
+        rather than at random, so the same frame always maps to the same
+        request and cache entry. The key also records the grid size: a montage
+        tile is a lower-resolution result than a single-frame request, so it
+        gets its own entry.
+        
+        Args:
+            frame: BGR frame to scribble on
+            frames_per_request: Frames tiled into each montage request
+            
+        Returns:
+            Tuple of (prompt, single-frame cache file, montage tile cache file
+            or None when frames_per_request is 1)
+        """
+        digest = hashlib.blake2b(np.ascontiguousarray(frame).data, digest_size=16)
+        prompt = config.SCRIBBLE_PROMPTS[digest.digest()[0] % len(config.SCRIBBLE_PROMPTS)]
+        digest.update(f"{config.GEMINI_MODEL}\0{prompt}".encode())
+        
+        def cache_file(grid_frames):
+            key = digest.copy()
+            key.update(f"\0{grid_frames}".encode())
+            return config.GEMINI_CACHE_DIR / f"{key.hexdigest()}.png"
         
-        draw.line(points, fill=color, width=line_width)
+        tile_cache_file = cache_file(frames_per_request) if frames_per_request > 1 else None
+        return prompt, cache_file(1), tile_cache_file
     
-    def _draw_squiggly_line(self, draw, width, height, color, line_width):
-        """Draw a random squiggly line."""
-        x1 = random.randint(0, width)
-        y1 = random.randint(0, height)
+    def _read_cache(self, cache_file: Path, frame: np.ndarray) -> Optional[np.ndarray]:
+        """Return the cached scribble for a frame, or None on a cache miss."""
+        if not cache_file.exists():
+            return None
+        return self._decode_image(cache_file.read_bytes(), frame)
+    
+    @staticmethod
+    def _write_cache(cache_file: Path, data: bytes):
+        """Store a generated image in the cache."""
+        # Write then rename, so a concurrent lookup never sees a partial file
+        tmp_file = cache_file.with_suffix(".tmp")
+        tmp_file.write_bytes(data)
+        tmp_file.replace(cache_file)
+    
+    @staticmethod
+    def _image_data(response) -> Optional[bytes]:
+        """Return the encoded image bytes from a Gemini response, or None if it holds no image."""
+        for part in response.parts:
+            if part.inline_data is not None:
+                return part.inline_data.data
+        
+        return None
+    
+    def _decode_image(self, data: bytes, frame: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Decode a generated image.
         
-        points = [(x1, y1)]
-        for _ in range(random.randint(3, 8)):
-            x1 += random.randint(-50, 50)
-            y1 += random.randint(-50, 50)
-            x1 = max(0, min(width, x1))
-            y1 = max(0, min(height, y1))
-            points.append((x1, y1))
+        The result is resized to the generator's output size (default: the
+        input frame's size).
         
-        draw.line(points, fill=color, width=line_width, joint='curve')
+        Args:
+            data: Encoded image bytes
+            frame: BGR frame that was sent with the request
+            
+        Returns:
+            Scribbled BGR frame, or None if the data can't be decoded
+        """
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            return None
+        return self._fit_image(image, frame)
+    
+    def _fit_image(self, image: np.ndarray, frame: np.ndarray) -> np.ndarray:
+        """Resize a generated image to the generator's output size (default: the input frame's size)."""
+        frame_size = self.frame_size or (frame.shape[1], frame.shape[0])
+        if (image.shape[1], image.shape[0]) != frame_size:
+            image = resize_frame(image, frame_size)
+        return image
     
-    def _draw_circle(self, draw, width, height, color, line_width):
-        """Draw a random circle."""
-        cx = random.randint(0, width)
-        cy = random.randint(0, height)
-        radius = random.randint(10, 40)
+    def _process_frame_experimental(self, frame: np.ndarray, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+        """
+        Process single frame using procedural scribble generation.
+        
+        Scribbles are built as point arrays and grouped by color, so the whole
+        frame is rasterized with one cv2.polylines (plus one cv2.fillPoly) call
+        per color instead of one call per shape.
+        
+        Args:
+            frame: BGR frame to scribble on (drawn in place)
+            rng: Random generator to draw with (default: the generator's own)
+            
+        Returns:
+            Scribbled BGR frame at the generator's output size
+        """
+        if rng is None:
+            rng = self._rng
+        height, width = frame.shape[:2]
+        bounds = (width, height)
+        
+        # color -> (stroked polylines, filled polygons)
+        layers = {}
+        
+        # Draw every scribble's shape, color, position and size in one call each
+        count = config.EXPERIMENTAL_SCRIBBLE_COUNT
+        kinds = rng.integers(0, len(self._shape_adders), count).tolist()
+        color_indices = rng.integers(0, len(config.SCRIBBLE_COLORS), count).tolist()
+        centers = rng.integers(0, bounds, (count, 2), endpoint=True).tolist()
+        sizes = rng.integers(10, 40, count, endpoint=True).tolist()
         
-        bbox = [cx - radius, cy - radius, cx + radius, cy + radius]
-        draw.ellipse(bbox, outline=color, width=line_width)
+        # Generate random scribbles
+        for kind, color_index, center, size in zip(kinds, color_indices, centers, sizes):
+            strokes, fills = layers.setdefault(config.SCRIBBLE_COLORS[color_index], ([], []))
+            self._shape_adders[kind](strokes, fills, center, size, rng, bounds)
+        
+        frame = rasterize_layers(frame, layers, rng)
+        if self.frame_size is not None and (width, height) != self.frame_size:
+            frame = resize_frame(frame, self.frame_size)
+        
+        return frame
+    
+    def _add_star(self, strokes, fills, center, size, rng, bounds):
+        """Add the outline of a star."""
+        strokes.append((self._STAR_UNIT * size + center).astype(np.int32))
+    
+    def _add_swirl(self, strokes, fills, center, size, rng, bounds):
+        """Add a swirl (fixed size)."""
+        strokes.append((self._SWIRL_OFFSETS + center).astype(np.int32))
+    
+    def _add_squiggly_line(self, strokes, fills, center, size, rng, bounds):
+        """Add a random squiggly line starting at center."""
+        steps = rng.integers(-50, 50, (rng.integers(3, 8, endpoint=True), 2), endpoint=True).tolist()
+        width, height = bounds
+        
+        # A random walk that stays inside the frame
+        x, y = center
+        points = [(x, y)]
+        for dx, dy in steps:
+            x = max(0, min(width, x + dx))
+            y = max(0, min(height, y + dy))
+            points.append((x, y))
+        
+        strokes.append(np.array(points, dtype=np.int32))
+    
+    def _add_circle(self, strokes, fills, center, size, rng, bounds):
+        """Add the outline of a circle."""
+        strokes.append((self._CIRCLE_UNIT * size + center).astype(np.int32))
     
-    def _draw_smiley(self, draw, width, height, color, line_width):
-        """Draw a random smiley face."""
-        cx = random.randint(0, width)
-        cy = random.randint(0, height)
-        size = random.randint(20, 50)
+    def _add_smiley(self, strokes, fills, center, size, rng, bounds):
+        """Add the outlines and filled eyes of a smiley face."""
+        size += 10  # Smileys run 20-50 px so the face stays readable
         
         # Face circle
-        bbox = [cx - size, cy - size, cx + size, cy + size]
-        draw.ellipse(bbox, outline=color, width=line_width)
+        strokes.append((self._CIRCLE_UNIT * size + center).astype(np.int32))
         
-        # Eyes
+        # Eyes, both placed in one broadcast: (2, 1, 2) centers + (N, 2) outline
         eye_offset = size // 3
         eye_size = size // 8
-        draw.ellipse([cx - eye_offset - eye_size, cy - eye_offset - eye_size,
-                     cx - eye_offset + eye_size, cy - eye_offset + eye_size],
-                     fill=color)
-        draw.ellipse([cx + eye_offset - eye_size, cy - eye_offset - eye_size,
-                     cx + eye_offset + eye_size, cy - eye_offset + eye_size],
-                     fill=color)
+        cx, cy = center
+        eye_centers = np.array([[[cx - eye_offset, cy - eye_offset]], [[cx + eye_offset, cy - eye_offset]]])
+        fills.extend((self._EYE_UNIT * eye_size + eye_centers).astype(np.int32))
         
         # Smile
-        smile_bbox = [cx - size//2, cy - size//2, cx + size//2, cy + size//2]
-        draw.arc(smile_bbox, start=0, end=180, fill=color, width=line_width)
+        strokes.append((self._SMILE_UNIT * (size // 2) + center).astype(np.int32))
+
+
+@lru_cache(maxsize=None)
+def _get_client(api_key: str) -> genai.Client:
+    """Create the Gemini client once per process so its connections are reused."""
+    return genai.Client(api_key=api_key)
+
+
+def _is_retryable(error: BaseException) -> bool:
+    """Rate limits (429) and server-side errors are worth retrying; other failures are not."""
+    return isinstance(error, errors.ServerError) or (isinstance(error, errors.ClientError) and error.code == 429)
+
+
+@retry(
+    retry=retry_if_exception(_is_retryable),
+    wait=wait_random_exponential(min=1, max=config.GEMINI_RETRY_MAX_WAIT),
+    stop=stop_after_attempt(config.GEMINI_MAX_ATTEMPTS),
+    reraise=True,
+)
+async def _generate_content(client: genai.Client, contents: list) -> types.GenerateContentResponse:
+    """
+    Send one Gemini request, backing off and retrying on transient errors.
+    
+    Args:
+        client: Gemini client
+        contents: Request contents (prompt and image part)
+        
+    Returns:
+        Gemini response
+    """
+    return await client.aio.models.generate_content(model=config.GEMINI_MODEL, contents=contents)
+
+
+def _image_part(frame: np.ndarray) -> types.Part:
+    """
+    Package a BGR frame as a JPEG part for a Gemini request.
+    
+    Encoding here (simplejpeg/libjpeg-turbo) skips the SDK's PIL path, which
+    would convert the frame to RGB and re-encode it as a much larger PNG.
+    
+    Args:
+        frame: BGR frame
+        
+    Returns:
+        Inline image part
+    """
+    return types.Part.from_bytes(data=encode_frame(frame), mime_type="image/jpeg")
+
+
+def _montage(frames: List[np.ndarray], rows: int, cols: int) -> np.ndarray:
+    """
+    Tile same-sized frames into a single image, row by row.
+    
+    Args:
+        frames: BGR frames (at most rows * cols); missing tiles are left black
+        rows: Number of tile rows
+        cols: Number of tile columns
+        
+    Returns:
+        BGR montage image
+    """
+    height, width = frames[0].shape[:2]
+    montage = np.zeros((rows * height, cols * width, 3), dtype=np.uint8)
+    for i, frame in enumerate(frames):
+        row, col = divmod(i, cols)
+        montage[row * height:(row + 1) * height, col * width:(col + 1) * width] = frame
+    return montage
+
+
+def rasterize_layers(frame: np.ndarray, layers: dict, rng: np.random.Generator) -> np.ndarray:
+    """
+    Draw grouped scribble geometry onto a frame.
+    
+    Each color group is rasterized with a single anti-aliased cv2.polylines
+    call (plus one cv2.fillPoly call for filled shapes), keeping the
+    per-pixel work inside OpenCV's native code.
+    
+    Args:
+        frame: BGR frame to draw on (in place)
+        layers: Mapping of RGB color -> (stroked polylines, filled polygons)
+        rng: Random generator for the line widths
+        
+    Returns:
+        The scribbled frame
+    """
+    line_widths = rng.integers(2, 5, len(layers), endpoint=True).tolist()
+    for (color, (strokes, fills)), line_width in zip(layers.items(), line_widths):
+        bgr = color[::-1]
+        cv2.polylines(frame, strokes, False, bgr, line_width, cv2.LINE_AA)
+        if fills:
+            cv2.fillPoly(frame, fills, bgr, cv2.LINE_AA)
+    
+    return frame
+
+
+def scribble_frames_parallel(
+    frames: Iterable[Tuple[int, np.ndarray]],
+    frame_size: Optional[Tuple[int, int]] = None,
+    seed: Optional[int] = None
+) -> Iterator[Tuple[int, Optional[np.ndarray]]]:
+    """
+    Scribble (index, frame) pairs on a thread pool in experimental mode.
+    
+    Threads share the frames without copying them, and the drawing itself
+    (cv2.polylines/fillPoly, resizing) runs in OpenCV with the GIL released.
+    At most 2 * config.SCRIBBLE_THREADS frames are in flight at once.
+    
+    Args:
+        frames: Iterable of (index, BGR frame) pairs
+        frame_size: Output dimensions as (width, height) (default: input frame size)
+        seed: Base seed; frame i is drawn with np.random.default_rng([seed, i])
+            (None draws every frame from one unseeded generator)
+            
+    Yields:
+        Tuples of (index, scribbled BGR frame), in input order; the frame is
+        None if it failed to process
+    """
+    generator = ScribbleGenerator(mode="experimental", frame_size=frame_size)
+    
+    def scribble(idx, frame):
+        # Seeding per frame keeps the output independent of which thread drew it
+        rng = np.random.default_rng([seed, idx]) if seed is not None else None
+        return generator._process_frame_experimental(frame, rng)
+    
+    def collect(idx, future):
+        try:
+            return idx, future.result()
+        except Exception as e:
+            print(f"Error processing frame {idx}: {e}")
+            return idx, None
+    
+    max_in_flight = 2 * config.SCRIBBLE_THREADS
+    with ThreadPoolExecutor(max_workers=config.SCRIBBLE_THREADS) as executor:
+        pending = deque()
+        for idx, frame in frames:
+            pending.append((idx, executor.submit(scribble, idx, frame)))
+            if len(pending) >= max_in_flight:
+                yield collect(*pending.popleft())
+        
+        while pending:
+            yield collect(*pending.popleft())
+
+
+def ordered_frames(results: Iterable[Tuple[int, Optional[np.ndarray]]]) -> Iterator[np.ndarray]:
+    """
+    Re-order (index, frame) results that arrive out of order, yielding frames by index.
+    
+    Args:
+        results: (index, frame) pairs covering indices 0..N-1; a None frame
+            marks a frame that failed to process and is skipped
+            
+    Yields:
+        Frames in index order
+    """
+    ordered = {}
+    next_idx = 0
+    
+    for idx, frame in results:
+        ordered[idx] = frame
+        
+        # Flush every frame that is now contiguous with what has been yielded
+        while next_idx in ordered:
+            frame = ordered.pop(next_idx)
+            next_idx += 1
+            
+            if frame is not None:
+                yield frame
+
+
+class OrderedFrameWriter:
+    """
+    Writes (index, frame) results in index order on a background thread.
+    
+    Results may be put in any order; they are re-ordered with ordered_frames
+    and handed to `write`. put() only blocks once config.STITCH_QUEUE_SIZE
+    results are waiting. If `write` raises, later results are discarded and
+    close() re-raises the error.
+    """
+    
+    def __init__(self, write: Callable[[np.ndarray], None]):
+        """
+        Start the writer thread.
+        
+        Args:
+            write: Called with each frame, in index order
+        """
+        self._write = write
+        # Bounded, so a producer faster than `write` waits instead of piling up frames;
+        # the thread keeps taking results whatever their order, so this can't deadlock
+        self._results = queue.Queue(maxsize=config.STITCH_QUEUE_SIZE)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+    
+    def _run(self):
+        results = iter(self._results.get, None)
+        try:
+            for frame in ordered_frames(results):
+                self._write(frame)
+        except Exception as e:
+            self._error = e
+            # Keep draining so results put after the failure don't pile up
+            for _ in results:
+                pass
+    
+    def put(self, result: Tuple[int, Optional[np.ndarray]]):
+        """Queue one (index, frame) result."""
+        self._results.put(result)
+    
+    def close(self):
+        """Wait until every queued frame is written, re-raising any write error."""
+        self._results.put(None)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+
+class AsyncRateLimiter:
+    """Token bucket that spaces out async requests to a steady rate."""
+    
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        Initialize rate limiter.
+        
+        Args:
+            rate: Requests allowed per second
+            burst: Number of requests that may start back-to-back
+        """
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        """Wait until a request may start."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                
+                await asyncio.sleep((1 - self._tokens) / self.rate)
@@ -2,10 +2,19 @@
 
 import cv2
 import os
+import queue
+import subprocess
+import tempfile
+import threading
+import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import chain
 from pathlib import Path
-from typing import Tuple, List
-from tqdm import tqdm
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple, List
 import config
+from frame_io import FrameArena, jpeg_size, list_frame_files, progress_bar, read_frames, write_frame
 
 
 class VideoProcessor:
@@ -14,17 +23,37 @@ class VideoProcessor:
     def __init__(self, video_path: str):
         """Initialize with video path."""
         self.video_path = Path(video_path)
-        self.fps = None
-        self.frame_size = None
-        self.total_frames = 0
-        
-    def extract_frames(self, output_dir: Path = None, max_duration: float = None) -> Tuple[int, float, Tuple[int, int]]:
+        self._metadata = None  # (fps, total_frames, frame_size), probed on first use
+        self.frame_files: List[Path] = []  # Frames written by the last extract_frames call
+    
+    @property
+    def fps(self) -> float:
+        """Frame rate of the source video."""
+        return self._probe()[0]
+    
+    @property
+    def total_frames(self) -> int:
+        """Number of frames in the source video."""
+        return self._probe()[1]
+    
+    @property
+    def frame_size(self) -> Tuple[int, int]:
+        """Source frame dimensions as (width, height)."""
+        return self._probe()[2]
+    
+    def extract_frames(
+        self,
+        output_dir: Path = None,
+        max_duration: float = None,
+        frame_skip: int = 1
+    ) -> Tuple[int, float, Tuple[int, int]]:
         """
         Extract all frames from video.
         
         Args:
             output_dir: Directory to save frames (default: temp/original)
             max_duration: Maximum duration in seconds to extract (None for full video)
+            frame_skip: Keep every Nth source frame (1 keeps all frames)
             
         Returns:
             Tuple of (total_frames, fps, frame_size)
@@ -33,64 +62,153 @@ class VideoProcessor:
             output_dir = config.TEMP_ORIGINAL_DIR
         
         # Clear existing frames
-        self._clear_directory(output_dir)
+        self.clear_directory(output_dir)
         
-        # Open video
-        cap = cv2.VideoCapture(str(self.video_path))
+        # Decode through the same batched path as in-memory streaming
+        frames = self.iter_frames(max_duration=max_duration, frame_skip=frame_skip)
         
-        if not cap.isOpened():
-            raise ValueError(f"Could not open video file: {self.video_path}")
+        # Extract frames; JPEG encoding releases the GIL, so frames are written on
+        # a few threads while the next ones are decoded
+        self.frame_files = []
+        max_pending = 2 * config.FRAME_WRITE_WORKERS  # Bounds the decoded frames held in memory
+        total = -(-self.count_frames(max_duration) // frame_skip)
+        with ThreadPoolExecutor(max_workers=config.FRAME_WRITE_WORKERS) as executor, \
+                progress_bar(total, "Extracting frames") as pbar:
+            pending = deque()
+            for frame_index, frame in frames:
+                # Save frame
+                frame_filename = output_dir / f"frame_{frame_index:05d}{config.FRAME_FORMAT}"
+                pending.append(executor.submit(write_frame, frame_filename, frame))
+                self.frame_files.append(frame_filename)
+                
+                if len(pending) >= max_pending:
+                    pending.popleft().result()
+                    pbar.update(1)
+            
+            while pending:
+                pending.popleft().result()
+                pbar.update(1)
         
-        # Get video properties
-        self.fps = cap.get(cv2.CAP_PROP_FPS)
-        self.total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        self.frame_size = (width, height)
+        frame_count = len(self.frame_files)
+        print(f"✅ Extracted {frame_count} frames to {output_dir}\n")
         
-        # Calculate frame limit based on duration
-        if max_duration is not None:
-            max_frames = int(max_duration * self.fps)
-            frames_to_extract = min(max_frames, self.total_frames)
-            print(f"📹 Video Info:")
-            print(f"   Resolution: {width}x{height}")
-            print(f"   FPS: {self.fps}")
-            print(f"   Total Frames: {self.total_frames} (Full video)")
-            print(f"   Extracting: First {max_duration} seconds ({frames_to_extract} frames)\n")
-        else:
-            frames_to_extract = self.total_frames
-            print(f"📹 Video Info:")
-            print(f"   Resolution: {width}x{height}")
-            print(f"   FPS: {self.fps}")
-            print(f"   Total Frames: {self.total_frames}")
-            print(f"   Duration: {self.total_frames/self.fps:.2f} seconds\n")
+        return frame_count, self.fps, self.frame_size
+    
+    def iter_frames(self, max_duration: float = None, frame_skip: int = 1) -> Iterator[Tuple[int, np.ndarray]]:
+        """
+        Decode frames straight into memory without touching the disk.
         
-        # Extract frames
-        frame_count = 0
-        with tqdm(total=frames_to_extract, desc="Extracting frames", unit="frame") as pbar:
-            while frame_count < frames_to_extract:
-                ret, frame = cap.read()
-                if not ret:
+        Frames are decoded by an ffmpeg subprocess in batches when ffmpeg is
+        available, and by OpenCV otherwise.
+        
+        Args:
+            max_duration: Maximum duration in seconds to read (None for full video)
+            frame_skip: Keep every Nth source frame (1 keeps all frames)
+            
+        Returns:
+            Iterator of (index, BGR frame) tuples, with indices renumbered after skipping
+        """
+        # Worked out eagerly so the video info is printed before any progress bar
+        frames_to_extract = self._frames_to_extract(max_duration)
+        
+        if ffmpeg_available():
+            return self._iter_frames_ffmpeg(frames_to_extract, frame_skip)
+        return self._iter_frames_capture(frames_to_extract, frame_skip)
+    
+    def _iter_frames_capture(self, frames_to_extract: int, frame_skip: int) -> Iterator[Tuple[int, np.ndarray]]:
+        """
+        Decode frames one at a time with OpenCV.
+        
+        Args:
+            frames_to_extract: Number of source frames to read
+            frame_skip: Keep every Nth source frame
+            
+        Yields:
+            Tuples of (index, BGR frame)
+        """
+        cap = self._open_capture()
+        try:
+            frame_index = 0
+            for source_index in range(frames_to_extract):
+                # Skipped frames are only demuxed (grab), never decoded (retrieve)
+                if not cap.grab():
                     break
+                if source_index % frame_skip:
+                    continue
                 
-                # Save frame
-                frame_filename = output_dir / f"frame_{frame_count:05d}.jpg"
-                cv2.imwrite(str(frame_filename), frame)
+                ret, frame = cap.retrieve()
+                if not ret:
+                    break
                 
-                frame_count += 1
-                pbar.update(1)
+                yield frame_index, frame
+                frame_index += 1
+        finally:
+            cap.release()
+    
+    def _iter_frames_ffmpeg(self, frames_to_extract: int, frame_skip: int) -> Iterator[Tuple[int, np.ndarray]]:
+        """
+        Decode frames in an ffmpeg subprocess and read them as raw BGR batches from a pipe.
         
-        cap.release()
-        print(f"✅ Extracted {frame_count} frames to {output_dir}\n")
+        ffmpeg drops skipped frames itself with a select filter and stops once
+        enough frames have been produced. Frames are passed through without
+        duplication or dropping (as OpenCV reads them), so counts match the
+        cv2 fallback.
         
-        return frame_count, self.fps, self.frame_size
+        Args:
+            frames_to_extract: Number of source frames to read
+            frame_skip: Keep every Nth source frame
+            
+        Yields:
+            Tuples of (index, BGR frame)
+        """
+        width, height = self.frame_size
+        frames_to_keep = -(-frames_to_extract // frame_skip)
+        
+        # -vsync rather than -fps_mode: the latter needs FFmpeg 5.1+, and distros still ship 4.x
+        command = [config.FFMPEG_BINARY, "-loglevel", "error", "-i", str(self.video_path), "-map", "0:v:0"]
+        if frame_skip > 1:
+            command += ["-vf", f"select=not(mod(n\\,{frame_skip}))"]
+        command += ["-vsync", "passthrough", "-frames:v", str(frames_to_keep), "-f", "rawvideo", "-pix_fmt", "bgr24", "-"]
+        
+        frame_bytes = height * width * 3
+        
+        # stderr goes to a file, not a pipe: a damaged input can log more than a pipe
+        # buffer holds, and ffmpeg would block on it while we block reading frames
+        stderr = tempfile.TemporaryFile()
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr)
+        try:
+            # Read a batch of frames per call into one (N, H, W, 3) array; each
+            # yielded frame is a view into a fresh batch, so it is never overwritten
+            for start in range(0, frames_to_keep, config.DECODE_BATCH_SIZE):
+                batch = np.empty((min(config.DECODE_BATCH_SIZE, frames_to_keep - start), height, width, 3), dtype=np.uint8)
+                frames_read = process.stdout.readinto(batch.reshape(-1)) // frame_bytes
+                
+                for offset in range(frames_read):
+                    yield start + offset, batch[offset]
+                if frames_read < len(batch):
+                    break
+            
+            # A failed decode looks like a short (or empty) stream, so check how ffmpeg exited
+            process.stdout.read()
+            if process.wait() != 0:
+                stderr.seek(0)
+                message = stderr.read()[-2000:].decode(errors="replace").strip()
+                raise RuntimeError(f"ffmpeg failed to decode {self.video_path} (exit code {process.returncode}): {message}")
+        finally:
+            if process.returncode is None:
+                # The consumer stopped early; don't wait for the rest of the video
+                process.kill()
+                process.wait()
+            process.stdout.close()
+            stderr.close()
     
     def stitch_frames(
         self, 
         frames_dir: Path = None, 
         output_path: str = None,
         fps: float = None,
-        frame_size: Tuple[int, int] = None
+        frame_size: Tuple[int, int] = None,
+        frame_files: List[Path] = None
     ) -> str:
         """
         Stitch frames back into a video.
@@ -99,7 +217,8 @@ class VideoProcessor:
             frames_dir: Directory containing frames (default: temp/scribbled)
             output_path: Output video path
             fps: Frames per second (uses extracted fps if None)
-            frame_size: Frame dimensions (uses extracted size if None)
+            frame_size: Frame dimensions (taken from the first frame if None; frames must already match)
+            frame_files: Frame files (JPEG or .npy) to stitch, in order (default: the arena in frames_dir)
             
         Returns:
             Path to output video
@@ -107,51 +226,408 @@ class VideoProcessor:
         if frames_dir is None:
             frames_dir = config.TEMP_SCRIBBLED_DIR
         
+        # Frames are decoded into a ring of reused buffers. At most one frame is
+        # being queued, STITCH_QUEUE_SIZE are waiting and one is being written.
+        ring_size = config.STITCH_QUEUE_SIZE + 2
+        
+        # Scribbled frames are normally packed in an arena; plain frame files also work
+        arena = FrameArena(frames_dir)
+        if frame_files is None and arena.exists():
+            frame_count = len(arena)
+            read_source = lambda: arena.read(ring_size=ring_size)
+            read_encoded = arena.read_encoded
+        else:
+            if frame_files is None:
+                frame_files = list_frame_files(frames_dir)
+            frame_count = len(frame_files)
+            read_source = lambda: read_frames(frame_files, ring_size=ring_size)
+            if all(Path(frame_file).suffix == ".jpg" for frame_file in frame_files):
+                read_encoded = lambda: (Path(frame_file).read_bytes() for frame_file in frame_files)
+            else:
+                read_encoded = None
+        
+        if not frame_count:
+            raise ValueError(f"No frames found in {frames_dir}")
+        
+        # An MJPEG video is just the stored JPEGs, so copy them in without decoding
+        if config.VIDEO_CODEC == "MJPG" and read_encoded is not None and ffmpeg_available():
+            return self._stitch_jpegs(read_encoded(), output_path, fps, frame_size, total=frame_count)
+        
+        # Decode on a background thread so JPEG decoding overlaps with encoding
+        frame_queue = queue.Queue(maxsize=config.STITCH_QUEUE_SIZE)
+        decode_errors = []
+        
+        def decode_frames():
+            try:
+                for frame in read_source():
+                    frame_queue.put(frame)
+            except Exception as e:
+                decode_errors.append(e)
+            finally:
+                frame_queue.put(None)
+        
+        def decoded_frames():
+            while (frame := frame_queue.get()) is not None:
+                yield frame
+            if decode_errors:
+                raise decode_errors[0]
+        
+        threading.Thread(target=decode_frames, daemon=True).start()
+        return self.stitch_from_iterable(decoded_frames(), output_path, fps, frame_size, total=frame_count)
+    
+    def stitch_from_iterable(
+        self,
+        frames: Iterable[np.ndarray],
+        output_path: str = None,
+        fps: float = None,
+        frame_size: Tuple[int, int] = None,
+        total: int = None
+    ) -> str:
+        """
+        Encode a stream of in-memory frames into a video as they arrive.
+        
+        Args:
+            frames: BGR frames, in order
+            output_path: Output video path
+            fps: Frames per second (uses extracted fps if None)
+            frame_size: Frame dimensions (taken from the first frame if None; frames must already match)
+            total: Expected number of frames, for the progress bar
+            
+        Returns:
+            Path to output video
+        """
+        return self._write_video(
+            frames, lambda frame: (frame.shape[1], frame.shape[0]), open_video_writer,
+            output_path, fps, frame_size, total
+        )
+    
+    def _stitch_jpegs(
+        self,
+        encoded: Iterable,
+        output_path: str = None,
+        fps: float = None,
+        frame_size: Tuple[int, int] = None,
+        total: int = None
+    ) -> str:
+        """
+        Mux already-encoded JPEG frames into an MJPEG video without re-encoding them.
+        
+        Args:
+            encoded: JPEG buffers, in order
+            output_path: Output video path
+            fps: Frames per second (uses extracted fps if None)
+            frame_size: Frame dimensions (taken from the first frame if None; frames must already match)
+            total: Expected number of frames, for the progress bar
+            
+        Returns:
+            Path to output video
+        """
+        # Only the first frame's JPEG header is read to check the size
+        return self._write_video(
+            encoded, jpeg_size, lambda path, fps, frame_size: FFmpegJPEGWriter(path, fps),
+            output_path, fps, frame_size, total
+        )
+    
+    def _write_video(
+        self,
+        frames: Iterable,
+        size_of: Callable[[Any], Tuple[int, int]],
+        open_writer: Callable,
+        output_path: str = None,
+        fps: float = None,
+        frame_size: Tuple[int, int] = None,
+        total: int = None
+    ) -> str:
+        """
+        Write frames to a video, shared by the decoded and the JPEG passthrough paths.
+        
+        Args:
+            frames: Frames in whatever form the writer takes, in order
+            size_of: Returns a frame's dimensions as (width, height)
+            open_writer: Called as open_writer(output_path, fps, frame_size); the
+                result must have write(frame) and release() methods
+            output_path: Output video path
+            fps: Frames per second (uses extracted fps if None)
+            frame_size: Frame dimensions (taken from the first frame if None; frames must already match)
+            total: Expected number of frames, for the progress bar
+            
+        Returns:
+            Path to output video
+        """
         if output_path is None:
             output_path = config.OUTPUT_DIR / f"scribbled_{self.video_path.stem}{config.VIDEO_EXTENSION}"
         
         fps = fps or self.fps or config.DEFAULT_FPS
         
-        # Get list of frames
-        frame_files = sorted(frames_dir.glob("frame_*.jpg"))
+        # Use the first frame to get dimensions if not provided
+        frames = iter(frames)
+        first_frame = next(frames, None)
+        if first_frame is None:
+            raise ValueError("No frames to stitch")
         
-        if not frame_files:
-            raise ValueError(f"No frames found in {frames_dir}")
-        
-        # Read first frame to get dimensions if not provided
+        # Scribbled frames already come out at the output size (see ScribbleGenerator)
+        first_size = size_of(first_frame)
         if frame_size is None:
-            first_frame = cv2.imread(str(frame_files[0]))
-            frame_size = (first_frame.shape[1], first_frame.shape[0])
+            frame_size = first_size
+        elif first_size != tuple(frame_size):
+            raise ValueError(f"Frames are {first_size[0]}x{first_size[1]}, expected {frame_size[0]}x{frame_size[1]}")
         
         # Create video writer
-        fourcc = cv2.VideoWriter_fourcc(*config.VIDEO_CODEC)
-        out = cv2.VideoWriter(str(output_path), fourcc, fps, frame_size)
+        out = open_writer(output_path, fps, frame_size)
         
         # Write frames
-        with tqdm(total=len(frame_files), desc="Stitching video", unit="frame") as pbar:
-            for frame_file in frame_files:
-                frame = cv2.imread(str(frame_file))
-                
-                # Resize if needed
-                if (frame.shape[1], frame.shape[0]) != frame_size:
-                    frame = cv2.resize(frame, frame_size)
-                
-                out.write(frame)
-                pbar.update(1)
+        try:
+            with progress_bar(total, "Stitching video") as pbar:
+                for frame in chain([first_frame], frames):
+                    out.write(frame)
+                    pbar.update(1)
+        finally:
+            out.release()
         
-        out.release()
         print(f"✅ Video saved to {output_path}\n")
         
         return str(output_path)
     
-    def _clear_directory(self, directory: Path):
+    def _probe(self) -> Tuple[float, int, Tuple[int, int]]:
+        """Read the video's properties once and cache them."""
+        if self._metadata is None:
+            self._open_capture().release()
+        return self._metadata
+    
+    def _open_capture(self) -> cv2.VideoCapture:
+        """
+        Open the video, caching its properties if they haven't been read yet.
+        
+        Returns:
+            Opened capture
+        """
+        cap = cv2.VideoCapture(str(self.video_path))
+        
+        if not cap.isOpened():
+            raise ValueError(f"Could not open video file: {self.video_path}")
+        
+        if self._metadata is None:
+            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            self._metadata = (
+                cap.get(cv2.CAP_PROP_FPS),
+                int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+                (width, height),
+            )
+        
+        return cap
+    
+    def count_frames(self, max_duration: float = None) -> int:
+        """
+        Number of source frames in the first max_duration seconds of the video.
+        
+        Args:
+            max_duration: Maximum duration in seconds (None for full video)
+            
+        Returns:
+            Number of frames
+        """
+        if max_duration is None:
+            return self.total_frames
+        return min(int(max_duration * self.fps), self.total_frames)
+    
+    def _frames_to_extract(self, max_duration: float = None) -> int:
+        """
+        Print the video's properties and work out how many frames to read.
+        
+        Args:
+            max_duration: Maximum duration in seconds to read (None for full video)
+            
+        Returns:
+            Number of frames to read
+        """
+        width, height = self.frame_size
+        frames_to_extract = self.count_frames(max_duration)
+        
+        if max_duration is not None:
+            print(f"📹 Video Info:")
+            print(f"   Resolution: {width}x{height}")
+            print(f"   FPS: {self.fps}")
+            print(f"   Total Frames: {self.total_frames} (Full video)")
+            print(f"   Extracting: First {max_duration} seconds ({frames_to_extract} frames)\n")
+        else:
+            print(f"📹 Video Info:")
+            print(f"   Resolution: {width}x{height}")
+            print(f"   FPS: {self.fps}")
+            print(f"   Total Frames: {self.total_frames}")
+            print(f"   Duration: {self.total_frames/self.fps:.2f} seconds\n")
+        
+        return frames_to_extract
+    
+    @staticmethod
+    def clear_directory(directory: Path):
         """Clear all files in directory."""
         if directory.exists():
-            for file in directory.glob("*"):
-                if file.is_file():
-                    file.unlink()
+            with os.scandir(directory) as entries:
+                files = [entry.path for entry in entries if entry.is_file()]
+            # unlink is syscall-bound, so overlap the calls on a few threads
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                list(executor.map(os.unlink, files))
     
     @staticmethod
     def get_frame_files(directory: Path) -> List[Path]:
         """Get sorted list of frame files from directory."""
-        return sorted(directory.glob("frame_*.jpg"))
+        return list_frame_files(directory)
+
+
+class FFmpegVideoWriter:
+    """Encodes raw BGR frames by piping them into an ffmpeg subprocess."""
+    
+    def __init__(self, output_path: str, fps: float, frame_size: Tuple[int, int], encoder: str):
+        """
+        Start the ffmpeg encoder process.
+        
+        Args:
+            output_path: Output video path
+            fps: Frames per second
+            frame_size: Frame dimensions as (width, height)
+            encoder: ffmpeg video encoder name (e.g. "h264_nvenc")
+        """
+        width, height = frame_size
+        self._shape = (height, width, 3)
+        input_options, output_options = _encoder_args(encoder)
+        command = [
+            config.FFMPEG_BINARY, "-y", "-loglevel", "error", *input_options,
+            "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{width}x{height}", "-r", str(fps), "-i", "-",
+            *output_options,
+            "-movflags", "+faststart",
+            str(output_path),
+        ]
+        self._process = subprocess.Popen(command, stdin=subprocess.PIPE)
+    
+    def write(self, frame: np.ndarray):
+        """Send one BGR frame to the encoder."""
+        if frame.shape != self._shape:
+            raise ValueError(f"Frame shape {frame.shape} does not match video shape {self._shape}")
+        self._process.stdin.write(np.ascontiguousarray(frame).data)
+    
+    def release(self):
+        """Flush the encoder and wait for ffmpeg to finish writing the file."""
+        self._process.stdin.close()
+        if self._process.wait() != 0:
+            raise RuntimeError(f"ffmpeg exited with code {self._process.returncode}")
+
+
+class FFmpegJPEGWriter:
+    """Muxes JPEG frames into an MJPEG video by piping them into ffmpeg, without re-encoding."""
+    
+    def __init__(self, output_path: str, fps: float):
+        """
+        Start the ffmpeg muxer process.
+        
+        Args:
+            output_path: Output video path
+            fps: Frames per second
+        """
+        command = [
+            config.FFMPEG_BINARY, "-y", "-loglevel", "error",
+            "-f", "mjpeg", "-framerate", str(fps), "-i", "-",
+            # Without an output rate the AVI muxer tags stream copies at twice fps
+            "-c:v", "copy", "-r", str(fps),
+            "-movflags", "+faststart",
+            str(output_path),
+        ]
+        self._process = subprocess.Popen(command, stdin=subprocess.PIPE)
+    
+    def write(self, data):
+        """Send one JPEG frame to the muxer."""
+        self._process.stdin.write(data)
+    
+    def release(self):
+        """Wait for ffmpeg to finish writing the file."""
+        self._process.stdin.close()
+        if self._process.wait() != 0:
+            raise RuntimeError(f"ffmpeg exited with code {self._process.returncode}")
+
+
+def open_video_writer(output_path: str, fps: float, frame_size: Tuple[int, int]):
+    """
+    Open the fastest available video writer.
+    
+    Uses an ffmpeg subprocess with the first working encoder from
+    config.VIDEO_ENCODERS (hardware NVENC first), falling back to OpenCV's
+    VideoWriter with config.VIDEO_CODEC when ffmpeg is not installed.
+    
+    Args:
+        output_path: Output video path
+        fps: Frames per second
+        frame_size: Frame dimensions as (width, height)
+        
+    Returns:
+        Writer object with write(frame) and release() methods
+    """
+    encoder = detect_video_encoder()
+    if encoder is not None:
+        return FFmpegVideoWriter(output_path, fps, frame_size, encoder)
+    
+    fourcc = cv2.VideoWriter_fourcc(*config.VIDEO_CODEC)
+    return cv2.VideoWriter(str(output_path), fourcc, fps, frame_size)
+
+
+@lru_cache(maxsize=None)
+def ffmpeg_available() -> bool:
+    """Check once whether the ffmpeg binary in config.FFMPEG_BINARY can be run."""
+    try:
+        return subprocess.run([config.FFMPEG_BINARY, "-version"], capture_output=True).returncode == 0
+    except OSError:
+        return False
+
+
+@lru_cache(maxsize=None)
+def detect_video_encoder() -> Optional[str]:
+    """
+    Find the first encoder in config.VIDEO_ENCODERS that ffmpeg can actually use.
+    
+    Runs once per process; each encoder is probed with a tiny test encode
+    because ffmpeg lists hardware encoders even when no supported GPU is present.
+    
+    Returns:
+        Encoder name, or None if ffmpeg is missing or no encoder works
+    """
+    if not ffmpeg_available():
+        return None
+    
+    for encoder in config.VIDEO_ENCODERS:
+        input_options, output_options = _encoder_args(encoder)
+        probe = [
+            config.FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", *input_options,
+            "-f", "lavfi", "-i", "color=size=256x256:duration=0.1",
+            *output_options, "-f", "null", "-",
+        ]
+        try:
+            result = subprocess.run(probe, capture_output=True, timeout=30)
+        except subprocess.TimeoutExpired:
+            continue
+        
+        if result.returncode == 0:
+            return encoder
+    
+    return None
+
+
+def _encoder_args(encoder: str) -> Tuple[List[str], List[str]]:
+    """
+    Build the ffmpeg arguments that select and configure a video encoder.
+    
+    Args:
+        encoder: ffmpeg video encoder name
+        
+    Returns:
+        Tuple of (options placed before the input, options placed after it)
+    """
+    input_options, upload_filter = config.VIDEO_ENCODER_HW_UPLOAD.get(encoder, ([], None))
+    output_options = ["-c:v", encoder, *config.VIDEO_ENCODER_OPTIONS.get(encoder, [])]
+    
+    # 4:2:0 chroma subsampling needs even dimensions
+    filters = "pad=ceil(iw/2)*2:ceil(ih/2)*2"
+    if upload_filter:
+        output_options += ["-vf", f"{filters},{upload_filter}"]
+    else:
+        output_options += ["-vf", filters, "-pix_fmt", "yuv420p"]
+    
+    return input_options, output_options